@@ -19,6 +19,27 @@ from .schema import Module, SNode, schema_in_format
 from .util import DataType, IOType, LibyangError, c2str, data_load, str2c
 
 
+# -------------------------------------------------------------------------------------
+def _features_array(features, keepalive: list):
+    """
+    Build the NULL-terminated "char *[]" array of feature names expected by libyang.
+
+    :arg features:
+        List of feature names, "*" enables all of them. When empty or None, NULL is
+        returned.
+    :arg keepalive:
+        List where the C strings are stored. It must outlive the returned array.
+    """
+    if not features:
+        return ffi.NULL
+    feat = ffi.new(f"char *[{len(features) + 1}]")
+    for i, name in enumerate(features):
+        keepalive.append(str2c(name))
+        feat[i] = keepalive[-1]
+    feat[len(features)] = ffi.NULL
+    return feat
+
+
 # -------------------------------------------------------------------------------------
 @ffi.def_extern(name="lypy_module_imp_data_free_clb")
 def libyang_c_module_imp_data_free_clb(cdata, user_data):
@@ -315,13 +336,8 @@ class Context:
         if ret != lib.LY_SUCCESS:
             raise self.error("failed to read input data")
 
-        feat = ffi.NULL
-        if features:
-            feat = ffi.new(f"char *[{len(features) + 1}]")
-            features = [str2c(i) for i in features]
-            for i, val in enumerate(features):
-                feat[i] = val
-            feat[len(features)] = ffi.NULL
+        feat_keepalive = []
+        feat = _features_array(features, feat_keepalive)
 
         mod = ffi.new("struct lys_module **")
         fmt = schema_in_format(fmt)
@@ -338,10 +354,13 @@ class Context:
     def parse_module_str(self, s: str, fmt: str = "yang", features=None) -> Module:
         return self.parse_module(s, IOType.MEMORY, fmt, features)
 
-    def load_module(self, name: str) -> Module:
+    def load_module(self, name: str, features=None) -> Module:
         if self.cdata is None:
             raise RuntimeError("context already destroyed")
-        mod = lib.ly_ctx_load_module(self.cdata, str2c(name), ffi.NULL, ffi.NULL)
+        feat_keepalive = []
+        feat = _features_array(features, feat_keepalive)
+
+        mod = lib.ly_ctx_load_module(self.cdata, str2c(name), ffi.NULL, feat)
         if mod == ffi.NULL:
             raise self.error("cannot load module")
 
@@ -3,7 +3,7 @@
 # SPDX-License-Identifier: MIT
 
 import logging
-from typing import IO, Any, Dict, Iterator, Optional, Tuple, Union
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple, Union
 
 from _libyang import ffi, lib
 from .keyed_list import KeyedList
@@ -214,18 +214,20 @@ def diff_flags(with_defaults: bool = False) -> int:
 
 # -------------------------------------------------------------------------------------
 class DNodeAttrs:
-    __slots__ = ("context", "parent", "cdata", "__dict__")
+    __slots__ = ("context", "parent", "cdata", "names", "__dict__")
 
     def __init__(self, context: "libyang.Context", parent: "libyang.DNode"):
         self.context = context
         self.parent = parent
         self.cdata = []  # C type: "struct lyd_attr *"
+        self.names = []  # decoded names of self.cdata items, in the same order
 
     def get(self, name: str) -> Optional[str]:
-        for attr_name, attr_value in self:
-            if attr_name == name:
-                return attr_value
-        return None
+        try:
+            i = self.names.index(name)
+        except ValueError:
+            return None
+        return c2str(self.cdata[i].value)
 
     def set(self, name: str, value: str):
         attrs = ffi.new("struct lyd_attr **")
@@ -239,23 +241,22 @@ class DNodeAttrs:
         if ret != lib.LY_SUCCESS:
             raise self.context.error("cannot create attr")
         self.cdata.append(attrs[0])
+        self.names.append(self._get_attr_name(attrs[0]))
 
     def remove(self, name: str):
-        for attr in self.cdata:
-            if self._get_attr_name(attr) == name:
-                lib.lyd_free_attr_single(self.context.cdata, attr)
-                self.cdata.remove(attr)
-                break
+        try:
+            i = self.names.index(name)
+        except ValueError:
+            return
+        lib.lyd_free_attr_single(self.context.cdata, self.cdata[i])
+        del self.cdata[i]
+        del self.names[i]
 
     def __contains__(self, name: str) -> bool:
-        for attr_name, _ in self:
-            if attr_name == name:
-                return True
-        return False
+        return name in self.names
 
     def __iter__(self) -> Iterator[Tuple[str, str]]:
-        for attr in self.cdata:
-            name = self._get_attr_name(attr)
+        for name, attr in zip(self.names, self.cdata):
             yield (name, c2str(attr.value))
 
     def __len__(self) -> int:
@@ -993,6 +994,8 @@ class DNode:
             lib.lyd_free_tree(self.cdata)
 
     def free(self, with_siblings: bool = True) -> None:
+        if not self.cdata:
+            return  # already freed
         try:
             if self.free_func:
                 self.free_func(self)  # pylint: disable=not-callable
@@ -1078,6 +1081,26 @@ class DContainer(DNode):
             path, parent=self, value=value, rpc_output=rpc_output, store_only=store_only
         )
 
+    def create_paths(
+        self,
+        values: Iterable[Tuple[str, Any]],
+        rpc_output: bool = False,
+        store_only: bool = False,
+    ) -> None:
+        """
+        Create multiple (path, value) pairs relative to this node. Unlike
+        create_path(), the created nodes are not looked up nor returned.
+        """
+        for path, value in values:
+            self.context.create_data_path(
+                path,
+                parent=self,
+                value=value,
+                rpc_output=rpc_output,
+                store_only=store_only,
+                force_return_value=False,
+            )
+
     def children(self, no_keys=False) -> Iterator[DNode]:
         if no_keys:
             child = lib.lyd_child_no_keys(self.cdata)
@@ -63,6 +63,12 @@ class ContextTest(unittest.TestCase):
             mod = ctx.load_module("yolo-system")
             self.assertIsInstance(mod, Module)
 
+    def test_ctx_load_module_features(self):
+        with Context(YANG_DIR) as ctx:
+            mod = ctx.load_module("yolo-system", features=["turbo-boost"])
+            self.assertTrue(mod.feature_state("turbo-boost"))
+            self.assertFalse(mod.feature_state("networking"))
+
     def test_ctx_get_module(self):
         with Context(YANG_DIR) as ctx:
             ctx.load_module("yolo-system")
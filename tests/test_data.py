@@ -1,14 +1,13 @@
 # Copyright (c) 2020 6WIND S.A.
 # SPDX-License-Identifier: MIT
 
+from contextlib import contextmanager
 import gc
 import json
 import os
 import unittest
-from unittest import mock
-from unittest.mock import patch
 
-from _libyang import lib
+from _libyang import ffi, lib
 from libyang import (
     Context,
     DAnyxml,
@@ -24,28 +23,117 @@ from libyang import (
     LibyangError,
     Module,
 )
+import libyang.data
 from libyang.data import dict_to_dnode
 
 
 YANG_DIR = os.path.join(os.path.dirname(__file__), "yang")
 
 
+# -------------------------------------------------------------------------------------
+class TrackingLib:
+    """
+    Forward to the original lib, recording the data nodes created and freed.
+    """
+
+    def __init__(self, orig):
+        self.orig = orig
+        self.created = []
+        self.freed = []
+
+    def lyd_new_inner(self, *args):
+        ret = self.orig.lyd_new_inner(*args)
+        if ret == lib.LY_SUCCESS:
+            self.created.append(args[4][0])
+        return ret
+
+    def lyd_new_term(self, *args):
+        ret = self.orig.lyd_new_term(*args)
+        if ret == lib.LY_SUCCESS:
+            self.created.append(args[5][0])
+        return ret
+
+    def lyd_new_list(self, *args):
+        ret = self.orig.lyd_new_list(*args)
+        if ret == lib.LY_SUCCESS:
+            self.created.append(args[4][0])
+        return ret
+
+    def lyd_free_tree(self, dnode):
+        self.freed.append(dnode)
+        self.orig.lyd_free_tree(dnode)
+
+    def __getattr__(self, name):
+        # only reached on the first access, later ones hit __dict__
+        value = getattr(self.orig, name)
+        setattr(self, name, value)
+        return value
+
+
 # -------------------------------------------------------------------------------------
 class DataTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR)
+        for name in ("ietf-netconf", "yolo-system", "yolo-nodetypes"):
+            cls.ctx.load_module(name, features=["*"])
+        cls.module = cls.ctx.get_module("yolo-system")
+        # parsed once for the tests that only read it, never modify it
+        cls.config = cls.ctx.parse_data_mem(
+            cls.JSON_CONFIG, "json", validate_present=True
+        )
+        cls.opaq_conf = cls._new_opaq_conf()
+        cls.config_obj = json.loads(cls.JSON_CONFIG)
+        cls.dnodes = []
+
+    @classmethod
+    def tearDownClass(cls):
+        # trees must be released before the context they belong to
+        for dnode in reversed(cls.dnodes):
+            dnode.free()
+        cls.dnodes = []
+        cls.opaq_conf.free()
+        cls.opaq_conf = None
+        cls.module = None
+        cls.config.free()
+        cls.config = None
+        cls.ctx.destroy()
+        cls.ctx = None
+
     def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        modules = [
-            self.ctx.load_module("ietf-netconf"),
-            self.ctx.load_module("yolo-system"),
-            self.ctx.load_module("yolo-nodetypes"),
-        ]
+        # do not report errors left behind by a previous test
+        lib.ly_err_clean(self.ctx.cdata, ffi.NULL)
+
+    def drop_shared_context(self):
+        self.tearDownClass()
+        self.addCleanup(self.setUpClass)
+        # libyang only reloads its plugins once no context is left alive.
+        # Contexts stuck in reference cycles are not released until a full
+        # collection, a young generation pass may miss them.
+        gc.collect()
 
-        for mod in modules:
-            mod.feature_enable_all()
+    def defer_free(self, dnode):
+        self.dnodes.append(dnode)
+        return dnode
 
-    def tearDown(self):
-        self.ctx.destroy()
-        self.ctx = None
+    @contextmanager
+    def owned(self, dnode):
+        try:
+            yield dnode
+        finally:
+            dnode.free()
+
+    @contextmanager
+    def parsed(self, in_data, fmt, **kwargs):
+        with self.owned(self.ctx.parse_data_mem(in_data, fmt, **kwargs)) as dnode:
+            self.assertIsInstance(dnode, DContainer)
+            yield dnode
+
+    def config_copy(self):
+        """
+        Private copy of the shared JSON_CONFIG tree, for tests that modify it.
+        """
+        return self.owned(self.config.duplicate(recursive=True, with_flags=True))
 
     JSON_CONFIG = """{
   "yolo-system:conf": {
@@ -76,13 +164,9 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_config_json(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", no_state=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.parsed(self.JSON_CONFIG, "json", no_state=True) as dnode:
             j = dnode.print_mem("json", with_siblings=True)
             self.assertEqual(j, self.JSON_CONFIG)
-        finally:
-            dnode.free()
 
     JSON_CONFIG_WITH_STATE = """{
   "yolo-system:state": {
@@ -116,13 +200,9 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_config_json_without_yang_lib(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json")
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.parsed(self.JSON_CONFIG, "json") as dnode:
             j = dnode.print_mem("json", with_siblings=True)
             self.assertEqual(j, self.JSON_CONFIG_WITH_STATE)
-        finally:
-            dnode.free()
 
     JSON_CONFIG_ADD_LIST_ITEM = """{
   "yolo-system:conf": {
@@ -158,41 +238,40 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_add_path(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", no_state=True)
-        dnode.new_path(
-            '/yolo-system:conf/url[host="barfoo.com"][proto="http"]/path',
-            "/barfoo/index.html",
-        )
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.config_copy() as dnode:
+            dnode.new_path(
+                '/yolo-system:conf/url[host="barfoo.com"][proto="http"]/path',
+                "/barfoo/index.html",
+            )
             j = dnode.print_mem("json", with_siblings=True)
             self.assertEqual(j, self.JSON_CONFIG_ADD_LIST_ITEM)
-        finally:
-            dnode.free()
 
     JSON_CONFIG_FILE = os.path.join(os.path.dirname(__file__), "data/config.json")
 
     def test_data_parse_config_json_file(self):
         with open(self.JSON_CONFIG_FILE, encoding="utf-8") as f:
-            dnode = self.ctx.parse_data_file(f, "json", no_state=True)
-        self.assertIsInstance(dnode, DContainer)
-        dnode.free()
-
-        with open(self.JSON_CONFIG_FILE, encoding="utf-8") as f:
-            dnode = self.ctx.parse_data(
-                "json", in_data=f, in_type=IOType.FILE, no_state=True
+            with self.owned(
+                self.ctx.parse_data_file(f, "json", no_state=True)
+            ) as dnode:
+                self.assertIsInstance(dnode, DContainer)
+
+            f.seek(0)
+            with self.owned(
+                self.ctx.parse_data(
+                    "json", in_data=f, in_type=IOType.FILE, no_state=True
+                )
+            ) as dnode:
+                self.assertIsInstance(dnode, DContainer)
+
+        with self.owned(
+            self.ctx.parse_data(
+                "json",
+                in_data=self.JSON_CONFIG_FILE,
+                in_type=IOType.FILEPATH,
+                no_state=True,
             )
-        self.assertIsInstance(dnode, DContainer)
-        dnode.free()
-
-        dnode = self.ctx.parse_data(
-            "json",
-            in_data=self.JSON_CONFIG_FILE,
-            in_type=IOType.FILEPATH,
-            no_state=True,
-        )
-        self.assertIsInstance(dnode, DContainer)
-        dnode.free()
+        ) as dnode:
+            self.assertIsInstance(dnode, DContainer)
 
     JSON_STATE = """{
   "yolo-system:state": {
@@ -223,13 +302,9 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_state_json(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_STATE, "json", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.parsed(self.JSON_STATE, "json", validate_present=True) as dnode:
             j = dnode.print_mem("json", with_siblings=True)
             self.assertEqual(j, self.JSON_STATE)
-        finally:
-            dnode.free()
 
     XML_CONFIG = """<conf xmlns="urn:yang:yolo:system">
   <hostname>foo</hostname>
@@ -254,13 +329,9 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_config_xml(self):
-        dnode = self.ctx.parse_data_mem(self.XML_CONFIG, "xml", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.parsed(self.XML_CONFIG, "xml", validate_present=True) as dnode:
             xml = dnode.print_mem("xml", with_siblings=True, trim_default_values=True)
             self.assertEqual(xml, self.XML_CONFIG)
-        finally:
-            dnode.free()
 
     XML_CONFIG_MULTI_ERROR = """<conf xmlns="urn:yang:yolo:system">
   <hostname>foo</hostname>
@@ -312,13 +383,9 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_data_xml(self):
-        dnode = self.ctx.parse_data_mem(self.XML_STATE, "xml", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.parsed(self.XML_STATE, "xml", validate_present=True) as dnode:
             xml = dnode.print("xml", out_type=IOType.MEMORY, with_siblings=True)
             self.assertEqual(xml, self.XML_STATE)
-        finally:
-            dnode.free()
 
     XML_NETCONF_IN = """<rpc xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
             <edit-config>
@@ -347,13 +414,12 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_netconf(self):
-        dnode = self.ctx.parse_op_mem("xml", self.XML_NETCONF_IN, DataType.RPC_NETCONF)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.owned(
+            self.ctx.parse_op_mem("xml", self.XML_NETCONF_IN, DataType.RPC_NETCONF)
+        ) as dnode:
+            self.assertIsInstance(dnode, DContainer)
             xml = dnode.print("xml", out_type=IOType.MEMORY)
             self.assertEqual(xml, self.XML_NETCONF_OUT)
-        finally:
-            dnode.free()
 
     ANYMXML = """<format-disk xmlns="urn:yang:yolo:system">
       <html-info>
@@ -364,44 +430,44 @@ class DataTest(unittest.TestCase):
 """
 
     def test_data_parse_anyxml(self):
-        dnode = self.ctx.parse_op_mem("xml", self.ANYMXML, dtype=DataType.RPC_YANG)
-        dnode = dnode.find_path("/yolo-system:format-disk/html-info")
+        rpc = self.ctx.parse_op_mem("xml", self.ANYMXML, dtype=DataType.RPC_YANG)
+        self.defer_free(rpc)
+        dnode = rpc.find_path("/yolo-system:format-disk/html-info")
         self.assertIsInstance(dnode, DAnyxml)
 
     def test_data_create_paths(self):
-        state = self.ctx.create_data_path("/yolo-system:state")
-        try:
-            state.create_path("hostname", "foo")
-            state.create_path("speed", 1234)
-            state.create_path("number", 1000)
-            state.create_path("number", 2000)
-            state.create_path("number", 3000)
+        with self.owned(self.ctx.create_data_path("/yolo-system:state")) as state:
+            state.create_paths(
+                [
+                    ("hostname", "foo"),
+                    ("speed", 1234),
+                    ("number", 1000),
+                    ("number", 2000),
+                    ("number", 3000),
+                ]
+            )
             u = state.create_path('url[proto="https"][host="github.com"]')
-            u.create_path("path", "/CESNET/libyang-python")
-            u.create_path("enabled", False)
+            u.create_paths([("path", "/CESNET/libyang-python"), ("enabled", False)])
             u = state.create_path('url[proto="http"][host="foobar.com"]')
-            u.create_path("port", 8080)
-            u.create_path("path", "/index.html")
-            u.create_path("enabled", True)
+            u.create_paths([("port", 8080), ("path", "/index.html"), ("enabled", True)])
             self.assertEqual(state.print_mem("json"), self.JSON_STATE)
-        finally:
-            state.free()
+
+    def test_data_create_paths_invalid(self):
+        with self.owned(self.ctx.create_data_path("/yolo-system:state")) as s:
+            with self.assertRaises(LibyangError):
+                s.create_paths([("hostname", "foo"), ("does-not-exist", "bar")])
+            with self.assertRaises(LibyangError):
+                s.create_paths([("speed", 1234000000000000000000000000)])
 
     def test_data_create_invalid_type(self):
-        s = self.ctx.create_data_path("/yolo-system:state")
-        try:
+        with self.owned(self.ctx.create_data_path("/yolo-system:state")) as s:
             with self.assertRaises(LibyangError):
                 s.create_path("speed", 1234000000000000000000000000)
-        finally:
-            s.free()
 
     def test_data_create_invalid_regexp(self):
-        s = self.ctx.create_data_path("/yolo-system:state")
-        try:
+        with self.owned(self.ctx.create_data_path("/yolo-system:state")) as s:
             with self.assertRaises(LibyangError):
                 s.create_path("hostname", "INVALID.HOST")
-        finally:
-            s.free()
 
     DICT_CONFIG = {
         "conf": {
@@ -427,51 +493,44 @@ class DataTest(unittest.TestCase):
     }
 
     def test_data_to_dict_config(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
-            dic = dnode.print_dict()
-        finally:
-            dnode.free()
-        self.assertEqual(dic, self.DICT_CONFIG)
+        self.assertEqual(self.config.print_dict(), self.DICT_CONFIG)
 
     def test_data_to_dict_rpc_input(self):
         in_data = '{"yolo-system:format-disk": {"disk": "/dev/sda"}}'
-        dnode = self.ctx.parse_op_mem("json", in_data, DataType.RPC_YANG)
-        self.assertIsInstance(dnode, DRpc)
-        try:
+        with self.owned(
+            self.ctx.parse_op_mem("json", in_data, DataType.RPC_YANG)
+        ) as dnode:
+            self.assertIsInstance(dnode, DRpc)
             dic = dnode.print_dict()
-        finally:
-            dnode.free()
         self.assertEqual(dic, {"format-disk": {"disk": "/dev/sda"}})
 
     def test_data_from_dict_module(self):
-        module = self.ctx.get_module("yolo-system")
-        dnode = module.parse_data_dict(
-            self.DICT_CONFIG, strict=True, validate_present=True
-        )
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.owned(
+            self.module.parse_data_dict(
+                self.DICT_CONFIG, strict=True, validate_present=True
+            )
+        ) as dnode:
+            self.assertIsInstance(dnode, DContainer)
             j = dnode.print_mem("json")
-        finally:
-            dnode.free()
-        self.assertEqual(json.loads(j), json.loads(self.JSON_CONFIG))
+        self.assertEqual(json.loads(j), self.config_obj)
 
     def test_data_from_dict_module_free_func(self):
-        module = self.ctx.get_module("yolo-system")
+        freed = []
 
-        free_func = mock.Mock()
-        dnode = module.parse_data_dict(
-            self.DICT_CONFIG, strict=True, validate_present=True
-        )
-        dnode.free_func = free_func
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        def free_func(node):
+            freed.append(node)
+            node.free_internal()
+
+        with self.owned(
+            self.module.parse_data_dict(
+                self.DICT_CONFIG, strict=True, validate_present=True
+            )
+        ) as dnode:
+            dnode.free_func = free_func
+            self.assertIsInstance(dnode, DContainer)
             j = dnode.print_mem("json")
-        finally:
-            dnode.free()
-        self.assertEqual(json.loads(j), json.loads(self.JSON_CONFIG))
-        free_func.assert_called()
+        self.assertEqual(json.loads(j), self.config_obj)
+        self.assertEqual(freed, [dnode])
 
     DICT_CONFIG_WITH_PREFIX = {
         "yolo-system:conf": {
@@ -497,57 +556,18 @@ class DataTest(unittest.TestCase):
     }
 
     def test_data_from_dict_module_with_prefix(self):
-        module = self.ctx.get_module("yolo-system")
-        dnode = module.parse_data_dict(
-            self.DICT_CONFIG_WITH_PREFIX, strict=True, validate_present=True
-        )
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.owned(
+            self.module.parse_data_dict(
+                self.DICT_CONFIG_WITH_PREFIX, strict=True, validate_present=True
+            )
+        ) as dnode:
+            self.assertIsInstance(dnode, DContainer)
             j = dnode.print_mem("json")
-        finally:
-            dnode.free()
-        self.assertEqual(json.loads(j), json.loads(self.JSON_CONFIG))
+        self.assertEqual(json.loads(j), self.config_obj)
 
     def test_data_from_dict_invalid(self):
-        module = self.ctx.get_module("yolo-system")
-
-        created = []
-        freed = []
-
-        class FakeLib:
-            def __init__(self, orig):
-                self.orig = orig
-
-            def lyd_new_inner(self, *args):
-                ret = self.orig.lyd_new_inner(*args)
-                c = args[4][0]
-                if ret == lib.LY_SUCCESS:
-                    created.append(c)
-                return ret
-
-            def lyd_new_term(self, *args):
-                ret = self.orig.lyd_new_term(*args)
-                c = args[5][0]
-                if ret == lib.LY_SUCCESS:
-                    created.append(c)
-                return ret
-
-            def lyd_new_list(self, *args):
-                ret = self.orig.lyd_new_list(*args)
-                c = args[4][0]
-                if ret == lib.LY_SUCCESS:
-                    created.append(c)
-                return ret
-
-            def lyd_free_tree(self, dnode):
-                freed.append(dnode)
-                self.orig.lyd_free_tree(dnode)
-
-            def __getattr__(self, name):
-                return getattr(self.orig, name)
-
-        fake_lib = FakeLib(lib)
-        root = module.parse_data_dict(
+        fake_lib = TrackingLib(lib)
+        root = self.module.parse_data_dict(
             {"conf": {"hostname": "foo", "speed": 1234, "number": [1000, 2000, 3000]}},
             strict=True,
             validate_present=True,
@@ -570,84 +590,74 @@ class DataTest(unittest.TestCase):
             ]
         }
 
-        try:
-            with patch("libyang.data.lib", fake_lib):
+        with self.owned(root):
+            libyang.data.lib = fake_lib
+            try:
                 with self.assertRaises(LibyangError):
                     root.merge_data_dict(
                         invalid_dict, strict=True, validate_present=True
                     )
+            finally:
+                libyang.data.lib = fake_lib.orig
 
-            self.assertGreater(len(created), 0)
-            self.assertGreater(len(freed), 0)
-            self.assertEqual(freed, list(reversed(created)))
-        finally:
-            root.free()
+            self.assertGreater(len(fake_lib.created), 0)
+            self.assertGreater(len(fake_lib.freed), 0)
+            self.assertEqual(fake_lib.freed, fake_lib.created[::-1])
 
     def test_data_from_dict_container(self):
-        dnode = self.ctx.create_data_path("/yolo-system:conf")
-        self.assertIsInstance(dnode, DContainer)
-        subtree = dnode.merge_data_dict(
-            self.DICT_CONFIG["conf"], strict=True, validate_present=True
-        )
-        # make sure subtree validation is forbidden
-        with self.assertRaises(LibyangError):
-            subtree.validate(validate_present=True)
-        try:
+        with self.owned(self.ctx.create_data_path("/yolo-system:conf")) as dnode:
+            self.assertIsInstance(dnode, DContainer)
+            subtree = dnode.merge_data_dict(
+                self.DICT_CONFIG["conf"], strict=True, validate_present=True
+            )
+            # make sure subtree validation is forbidden
+            with self.assertRaises(LibyangError):
+                subtree.validate(validate_present=True)
             dnode.validate(validate_present=True)
             j = dnode.print_mem("json")
-        finally:
-            dnode.free()
-        self.assertEqual(json.loads(j), json.loads(self.JSON_CONFIG))
+        self.assertEqual(json.loads(j), self.config_obj)
 
     def test_data_from_dict_leaf(self):
-        dnode = self.ctx.create_data_path("/yolo-system:state")
-        self.assertIsInstance(dnode, DContainer)
-        dnode.merge_data_dict(
-            {"hostname": "foo"}, strict=True, validate=True, validate_present=True
-        )
-        try:
+        with self.owned(self.ctx.create_data_path("/yolo-system:state")) as dnode:
+            self.assertIsInstance(dnode, DContainer)
+            dnode.merge_data_dict(
+                {"hostname": "foo"}, strict=True, validate=True, validate_present=True
+            )
             j = dnode.print_mem("json", pretty=False, trim_default_values=True)
-        finally:
-            dnode.free()
         self.assertEqual(j, '{"yolo-system:state":{"hostname":"foo"}}')
 
     def test_data_from_dict_rpc(self):
-        dnode = self.ctx.create_data_path("/yolo-system:format-disk")
-        self.assertIsInstance(dnode, DRpc)
-        dnode.merge_data_dict(
-            {"duration": 42},
-            strict=True,
-            validate=True,
-            rpcreply=True,
-        )
-        try:
+        with self.owned(self.ctx.create_data_path("/yolo-system:format-disk")) as dnode:
+            self.assertIsInstance(dnode, DRpc)
+            dnode.merge_data_dict(
+                {"duration": 42},
+                strict=True,
+                validate=True,
+                rpcreply=True,
+            )
             j = dnode.print_mem("json", pretty=False)
-        finally:
-            dnode.free()
         self.assertEqual(j, '{"yolo-system:format-disk":{"duration":42}}')
 
     def test_data_from_dict_action(self):
-        module = self.ctx.get_module("yolo-system")
-        dnode = module.parse_data_dict(
-            {
-                "conf": {
-                    "url": [
-                        {
-                            "proto": "https",
-                            "host": "github.com",
-                            "fetch": {"timeout": 42},
-                        },
-                    ],
+        with self.owned(
+            self.module.parse_data_dict(
+                {
+                    "conf": {
+                        "url": [
+                            {
+                                "proto": "https",
+                                "host": "github.com",
+                                "fetch": {"timeout": 42},
+                            },
+                        ],
+                    },
                 },
-            },
-            strict=True,
-            rpc=True,
-        )
-        self.assertIsInstance(dnode, DContainer)
-        try:
+                strict=True,
+                rpc=True,
+            )
+        ) as dnode:
+            self.assertIsInstance(dnode, DContainer)
             j = dnode.print_mem("json")
-        finally:
-            dnode.free()
         self.assertEqual(
             j,
             """{
@@ -667,35 +677,33 @@ class DataTest(unittest.TestCase):
         )
 
     def test_data_to_dict_action(self):
-        module = self.ctx.get_module("yolo-system")
-        request = module.parse_data_dict(
-            {
-                "conf": {
-                    "url": [
-                        {
-                            "proto": "https",
-                            "host": "github.com",
-                            "fetch": {"timeout": 42},
-                        },
-                    ],
+        with self.owned(
+            self.module.parse_data_dict(
+                {
+                    "conf": {
+                        "url": [
+                            {
+                                "proto": "https",
+                                "host": "github.com",
+                                "fetch": {"timeout": 42},
+                            },
+                        ],
+                    },
                 },
-            },
-            strict=True,
-            rpc=True,
-        )
-        request = request.find_path(
-            "/yolo-system:conf/url[proto='https'][host='github.com']/fetch"
-        )
-        dnode = self.ctx.parse_op_mem(
-            "json",
-            '{"yolo-system:result":"not found"}',
-            dtype=DataType.REPLY_YANG,
-            parent=request,
-        )
-        try:
+                strict=True,
+                rpc=True,
+            )
+        ) as root:
+            request = root.find_path(
+                "/yolo-system:conf/url[proto='https'][host='github.com']/fetch"
+            )
+            dnode = self.ctx.parse_op_mem(
+                "json",
+                '{"yolo-system:result":"not found"}',
+                dtype=DataType.REPLY_YANG,
+                parent=request,
+            )
             dic = dnode.print_dict()
-        finally:
-            request.free()
 
         self.assertEqual(
             dic,
@@ -728,13 +736,11 @@ class DataTest(unittest.TestCase):
 """
 
     def test_notification_from_dict_module(self):
-        module = self.ctx.get_module("yolo-system")
-        dnotif = module.parse_data_dict(self.DICT_NOTIF, strict=True, notification=True)
-        self.assertIsInstance(dnotif, DNotif)
-        try:
+        with self.owned(
+            self.module.parse_data_dict(self.DICT_NOTIF, strict=True, notification=True)
+        ) as dnotif:
+            self.assertIsInstance(dnotif, DNotif)
             j = dnotif.print_mem("json")
-        finally:
-            dnotif.free()
         self.assertEqual(json.loads(j), json.loads(self.JSON_NOTIF))
 
     DICT_NOTIF_KEYLESS_LIST = {
@@ -742,15 +748,13 @@ class DataTest(unittest.TestCase):
     }
 
     def test_data_to_dict_keyless_list(self):
-        module = self.ctx.get_module("yolo-system")
-        dnotif = module.parse_data_dict(
-            self.DICT_NOTIF_KEYLESS_LIST, strict=True, notification=True
-        )
-        self.assertIsInstance(dnotif, DNotif)
-        try:
+        with self.owned(
+            self.module.parse_data_dict(
+                self.DICT_NOTIF_KEYLESS_LIST, strict=True, notification=True
+            )
+        ) as dnotif:
+            self.assertIsInstance(dnotif, DNotif)
             dic = dnotif.print_dict()
-        finally:
-            dnotif.free()
         self.assertEqual(dic, self.DICT_NOTIF_KEYLESS_LIST)
 
     XML_DIFF_STATE1 = """<state xmlns="urn:yang:yolo:system">
@@ -827,18 +831,18 @@ class DataTest(unittest.TestCase):
         dnode1 = self.ctx.parse_data_mem(
             self.XML_DIFF_STATE1, "xml", validate_present=True
         )
+        self.defer_free(dnode1)
         self.assertIsInstance(dnode1, DContainer)
         dnode2 = self.ctx.parse_data_mem(
             self.XML_DIFF_STATE2, "xml", validate_present=True
         )
+        self.defer_free(dnode2)
         self.assertIsInstance(dnode2, DContainer)
 
-        result = dnode1.diff(dnode2)
+        result = self.defer_free(dnode1.diff(dnode2))
         self.assertEqual(result.print_mem("xml"), self.XML_DIFF_RESULT)
-        dnode1.free()
-        dnode2.free()
 
-    TREE = [
+    TREE = (
         "/yolo-system:conf",
         "/yolo-system:conf/hostname",
         "/yolo-system:conf/url[proto='https'][host='github.com']",
@@ -856,53 +860,40 @@ class DataTest(unittest.TestCase):
         "/yolo-system:conf/number[.='2000']",
         "/yolo-system:conf/number[.='3000']",
         "/yolo-system:conf/speed",
-    ]
+    )
 
     def test_iter_tree(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", validate_present=True)
-        try:
-            paths = [d.path() for d in dnode.iter_tree()]
-            self.assertEqual(paths, self.TREE)
-        finally:
-            dnode.free()
+        paths = tuple(d.path() for d in self.config.iter_tree())
+        self.assertEqual(paths, self.TREE)
 
     def test_find_one(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
-            hostname = dnode.find_one("hostname")
-            self.assertIsInstance(hostname, DNode)
-            self.assertEqual(hostname.name(), "hostname")
-        finally:
-            dnode.free()
+        hostname = self.config.find_one("hostname")
+        self.assertIsInstance(hostname, DNode)
+        self.assertEqual(hostname.name(), "hostname")
 
     def test_find_all(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
-            urls = dnode.find_all("url")
-            urls = list(urls)
-            self.assertEqual(len(urls), 2)
-
-            expected_url = {
-                "url": [
-                    {
-                        "proto": "https",
-                        "host": "github.com",
-                        "path": "/CESNET/libyang-python",
-                        "enabled": False,
-                    }
-                ]
-            }
-            self.assertEqual(urls[0].print_dict(absolute=False), expected_url)
-        finally:
-            dnode.free()
+        urls = self.config.find_all("url")
+        first = next(urls)
+        self.assertEqual(len(list(urls)), 1)
+
+        expected_url = {
+            "url": [
+                {
+                    "proto": "https",
+                    "host": "github.com",
+                    "path": "/CESNET/libyang-python",
+                    "enabled": False,
+                }
+            ]
+        }
+        self.assertEqual(first.print_dict(absolute=False), expected_url)
 
     def test_add_defaults(self):
         JSON = '{"yolo-nodetypes:records": [{"id": "rec1"}], "yolo-nodetypes:conf": {}}'
         dnode = self.ctx.parse_data_mem(
             JSON, "json", validate_present=True, parse_only=True
         )
+        self.defer_free(dnode)
         self.assertIsInstance(dnode, DList)
         node = dnode.find_one("id")
         self.assertIsInstance(node, DLeaf)
@@ -938,9 +929,7 @@ class DataTest(unittest.TestCase):
         dnode.free()
 
     def test_dnode_unlink(self):
-        dnode = self.ctx.parse_data_mem(self.JSON_CONFIG, "json", validate_present=True)
-        self.assertIsInstance(dnode, DContainer)
-        try:
+        with self.config_copy() as dnode:
             child = dnode.find_one("hostname")
             self.assertIsInstance(child, DNode)
             child.unlink(with_siblings=False)
@@ -950,8 +939,6 @@ class DataTest(unittest.TestCase):
             child.unlink(with_siblings=True)
             child = next(dnode.children(), None)
             self.assertIsNone(child, None)
-        finally:
-            dnode.free()
 
     def test_dnode_insert_sibling(self):
         MAIN = {"yolo-nodetypes:conf": {"percentage": "20.2"}}
@@ -962,6 +949,7 @@ class DataTest(unittest.TestCase):
         self.assertEqual(len(list(dnode1.siblings(include_self=False))), 0)
         self.assertEqual(len(list(dnode2.siblings(include_self=False))), 0)
         dnode2.insert_sibling(dnode1)
+        self.defer_free(dnode1)
         self.assertEqual(len(list(dnode1.siblings(include_self=False))), 1)
         self.assertEqual(len(list(dnode2.siblings(include_self=False))), 1)
         sibling = next(dnode1.siblings(include_self=False), None)
@@ -979,28 +967,34 @@ class DataTest(unittest.TestCase):
         self.assertEqual(dnode1.first_sibling().cdata, dnode1.cdata)
         dnode1.insert_before(dnode2)
         dnode1.insert_after(dnode3)
+        self.defer_free(dnode1)
         self.assertEqual(
             [dnode2.cdata, dnode1.cdata, dnode3.cdata],
             [s.cdata for s in dnode1.first_sibling().siblings()],
         )
         self.assertEqual(dnode1.first_sibling().cdata, dnode2.cdata)
 
-    def _create_opaq_hostname(self):
-        root = self.ctx.create_data_path(path="/yolo-system:conf")
+    @classmethod
+    def _new_opaq_conf(cls):
+        root = cls.ctx.create_data_path(path="/yolo-system:conf")
         root.new_path(
             "hostname",
             None,
             opt_opaq=True,
         )
+        return root
+
+    def _create_opaq_hostname(self):
+        root = self.defer_free(self._new_opaq_conf())
         return root.find_one("/yolo-system:conf/hostname")
 
     def test_dnode_new_opaq_find_one(self):
-        dnode = self._create_opaq_hostname()
+        dnode = self.opaq_conf.find_one("/yolo-system:conf/hostname")
 
         self.assertIsInstance(dnode, DLeaf)
 
     def test_dnode_attrs(self):
-        dnode = self._create_opaq_hostname()
+        dnode = self.opaq_conf.find_one("/yolo-system:conf/hostname")
         attrs = dnode.attrs()
 
         self.assertIsInstance(attrs, DNodeAttrs)
@@ -1040,6 +1034,17 @@ class DataTest(unittest.TestCase):
 
         self.assertTrue("ietf-netconf:operation" in attrs)
 
+    def test_dnode_attrs__iter(self):
+        dnode = self._create_opaq_hostname()
+        attrs = dnode.attrs()
+
+        attrs.set("ietf-netconf:operation", "remove")
+        attrs.set("no_prefix", "test")
+        attrs.remove("ietf-netconf:operation")
+
+        self.assertEqual(list(attrs), [("no_prefix", "test")])
+        self.assertIsNone(attrs.get("ietf-netconf:operation"))
+
     def test_dnode_attrs_remove(self):
         dnode = self._create_opaq_hostname()
         attrs = dnode.attrs()
@@ -1069,65 +1074,79 @@ class DataTest(unittest.TestCase):
         attrs.remove("ietf-netconf:operation")
         self.assertEqual(len(attrs), 0)
 
-    def test_dnode_leafref_linking(self):
-        MAIN = """{
-            "yolo-leafref-extended:list1": [{
-                "leaf1": "val1",
-                "leaflist2": ["val2", "val3"]
-            }],
-            "yolo-leafref-extended:ref1": "val1"
-            }"""
-        self.ctx.destroy()
-        self.ctx = Context(YANG_DIR, leafref_extended=True, leafref_linking=True)
-        mod = self.ctx.load_module("yolo-leafref-extended")
-        self.assertIsInstance(mod, Module)
-        dnode1 = self.ctx.parse_data_mem(MAIN, "json", parse_only=True)
-        self.assertIsInstance(dnode1, DList)
-        dnode2 = next(dnode1.siblings(include_self=False))
-        self.assertIsInstance(dnode2, DLeaf)
-        dnode3 = next(dnode1.children())
-        self.assertIsInstance(dnode3, DLeaf)
-        self.assertIsNone(next(dnode3.leafref_nodes(), None))
-        dnode2.leafref_link_node_tree()
-        dnode4 = next(dnode3.leafref_nodes())
-        self.assertIsInstance(dnode4, DLeaf)
-        self.assertEqual(dnode4.cdata, dnode2.cdata)
-        dnode1.free()
-
     def test_dnode_store_only(self):
         MAIN = {"yolo-nodetypes:test1": 50}
         module = self.ctx.load_module("yolo-nodetypes")
         dnode = dict_to_dnode(MAIN, module, None, validate=False, store_only=True)
+        self.defer_free(dnode)
         self.assertIsInstance(dnode, DLeaf)
         self.assertEqual(dnode.value(), 50)
-        dnode.free()
 
     def test_dnode_builtin_plugins_only(self):
         MAIN = {"yolo-nodetypes:ip-address": "test"}
-        self.tearDown()
-        gc.collect()
-        self.ctx = Context(YANG_DIR, builtin_plugins_only=True)
-        module = self.ctx.load_module("yolo-nodetypes")
-        dnode = dict_to_dnode(MAIN, module, None, validate=False, store_only=True)
-        self.assertIsInstance(dnode, DLeaf)
-        self.assertEqual(dnode.value(), "test")
-        dnode.free()
+        self.drop_shared_context()
+        with Context(YANG_DIR, builtin_plugins_only=True) as ctx:
+            module = ctx.load_module("yolo-nodetypes")
+            dnode = dict_to_dnode(MAIN, module, None, validate=False, store_only=True)
+            try:
+                self.assertIsInstance(dnode, DLeaf)
+                self.assertEqual(dnode.value(), "test")
+            finally:
+                dnode.free()
 
     def test_merge_store_only(self):
         MAIN = {"yolo-nodetypes:test1": 50}
         module = self.ctx.load_module("yolo-nodetypes")
         dnode = module.parse_data_dict(MAIN, validate=False, store_only=True)
+        self.defer_free(dnode)
         self.assertIsInstance(dnode, DLeaf)
         self.assertEqual(dnode.value(), 50)
-        dnode.free()
 
     def test_merge_builtin_plugins_only(self):
         MAIN = {"yolo-nodetypes:ip-address": "test"}
-        self.tearDown()
-        gc.collect()
-        self.ctx = Context(YANG_DIR, builtin_plugins_only=True)
-        module = self.ctx.load_module("yolo-nodetypes")
-        dnode = module.parse_data_dict(MAIN, validate=False, store_only=True)
-        self.assertIsInstance(dnode, DLeaf)
-        self.assertEqual(dnode.value(), "test")
-        dnode.free()
+        self.drop_shared_context()
+        with Context(YANG_DIR, builtin_plugins_only=True) as ctx:
+            module = ctx.load_module("yolo-nodetypes")
+            dnode = module.parse_data_dict(MAIN, validate=False, store_only=True)
+            try:
+                self.assertIsInstance(dnode, DLeaf)
+                self.assertEqual(dnode.value(), "test")
+            finally:
+                dnode.free()
+
+
+# -------------------------------------------------------------------------------------
+class LeafrefLinkingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR, leafref_extended=True, leafref_linking=True)
+        cls.module = cls.ctx.load_module("yolo-leafref-extended")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ctx.destroy()
+        cls.ctx = None
+
+    def test_dnode_leafref_linking(self):
+        MAIN = """{
+            "yolo-leafref-extended:list1": [{
+                "leaf1": "val1",
+                "leaflist2": ["val2", "val3"]
+            }],
+            "yolo-leafref-extended:ref1": "val1"
+            }"""
+        self.assertIsInstance(self.module, Module)
+        dnode1 = self.ctx.parse_data_mem(MAIN, "json", parse_only=True)
+        try:
+            self.assertIsInstance(dnode1, DList)
+            dnode2 = dnode1.next()
+            self.assertIsInstance(dnode2, DLeaf)
+            dnode3 = next(dnode1.children())
+            self.assertIsInstance(dnode3, DLeaf)
+            self.assertIsNone(next(dnode3.leafref_nodes(), None))
+            dnode2.leafref_link_node_tree()
+            dnode4 = next(dnode3.leafref_nodes())
+            self.assertIsInstance(dnode4, DLeaf)
+            self.assertEqual(dnode4.cdata, dnode2.cdata)
+        finally:
+            dnode1.free()
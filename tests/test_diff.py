@@ -96,17 +96,26 @@ class DiffTest(unittest.TestCase):
         )
     )
 
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx_old = Context(OLD_YANG_DIR)
+        cls.ctx_old.load_module("yolo-system", features=["*"])
+        cls.ctx_new = Context(NEW_YANG_DIR)
+        cls.ctx_new.load_module("yolo-system", features=["*"])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ctx_old.destroy()
+        cls.ctx_old = None
+        cls.ctx_new.destroy()
+        cls.ctx_new = None
+
     def test_diff(self):
-        with Context(OLD_YANG_DIR) as ctx_old, Context(NEW_YANG_DIR) as ctx_new:
-            mod = ctx_old.load_module("yolo-system")
-            mod.feature_enable_all()
-            mod = ctx_new.load_module("yolo-system")
-            mod.feature_enable_all()
-            diffs = []
-            for d in schema_diff(ctx_old, ctx_new):
-                if isinstance(d, (SNodeAdded, SNodeRemoved)):
-                    diffs.append((d.__class__, d.node.schema_path()))
-                else:
-                    diffs.append((d.__class__, d.new.schema_path()))
+        diffs = []
+        for d in schema_diff(self.ctx_old, self.ctx_new):
+            if isinstance(d, (SNodeAdded, SNodeRemoved)):
+                diffs.append((d.__class__, d.node.schema_path()))
+            else:
+                diffs.append((d.__class__, d.new.schema_path()))
 
-            self.assertEqual(frozenset(diffs), self.expected_diffs)
+        self.assertEqual(frozenset(diffs), self.expected_diffs)
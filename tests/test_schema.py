@@ -52,14 +52,16 @@ YANG_DIR = os.path.join(os.path.dirname(__file__), "yang")
 
 # -------------------------------------------------------------------------------------
 class ModuleTest(unittest.TestCase):
-    def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        self.module = self.ctx.load_module("yolo-system")
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR)
+        cls.module = cls.ctx.load_module("yolo-system")
 
-    def tearDown(self):
-        self.module = None
-        self.ctx.destroy()
-        self.ctx = None
+    @classmethod
+    def tearDownClass(cls):
+        cls.module = None
+        cls.ctx.destroy()
+        cls.ctx = None
 
     def test_mod_print_mem(self):
         s = self.module.print("tree", IOType.MEMORY)
@@ -79,14 +81,15 @@ class ModuleTest(unittest.TestCase):
         )
 
     def test_mod_iter(self):
-        children = list(iter(self.module))
-        self.assertEqual(len(children), 6)
+        self.assertEqual(sum(1 for _ in self.module), 6)
 
     def test_mod_children_rpcs(self):
         rpcs = list(self.module.children(types=(SNode.RPC,)))
         self.assertEqual(len(rpcs), 2)
 
     def test_mod_enable_features(self):
+        # the module is shared by all tests, leave all features disabled
+        self.addCleanup(self.module.feature_disable_all)
         self.assertFalse(self.module.feature_state("turbo-boost"))
         self.module.feature_enable("turbo-boost")
         self.module.feature_enable("*")
@@ -95,7 +98,6 @@ class ModuleTest(unittest.TestCase):
         self.assertFalse(self.module.feature_state("turbo-boost"))
         self.module.feature_enable_all()
         self.assertTrue(self.module.feature_state("turbo-boost"))
-        self.module.feature_disable_all()
 
     def test_mod_imports(self):
         imports = list(self.module.imports())
@@ -108,6 +110,7 @@ class ModuleTest(unittest.TestCase):
         self.assertEqual(len(features), 2)
 
     def test_mod_get_feature(self):
+        self.addCleanup(self.module.feature_disable_all)
         self.module.feature_enable("turbo-boost")
         feature = self.module.get_feature("turbo-boost")
         self.assertEqual(feature.name(), "turbo-boost")
@@ -260,16 +263,17 @@ class IfFeatureTest(unittest.TestCase):
 
 # -------------------------------------------------------------------------------------
 class ContainerTest(unittest.TestCase):
-    def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        mod = self.ctx.load_module("yolo-system")
-        mod.feature_enable_all()
-        self.container = next(self.ctx.find_path("/yolo-system:conf"))
-
-    def tearDown(self):
-        self.container = None
-        self.ctx.destroy()
-        self.ctx = None
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR)
+        cls.ctx.load_module("yolo-system", features=["*"])
+        cls.container = next(cls.ctx.find_path("/yolo-system:conf"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.container = None
+        cls.ctx.destroy()
+        cls.ctx = None
 
     def test_cont_attrs(self):
         self.assertIsInstance(self.container, SContainer)
@@ -287,12 +291,11 @@ class ContainerTest(unittest.TestCase):
         self.assertIs(self.container.presence(), None)
 
     def test_cont_iter(self):
-        children = list(iter(self.container))
-        self.assertEqual(len(children), 11)
+        self.assertEqual(sum(1 for _ in self.container), 11)
 
     def test_cont_children_leafs(self):
-        leafs = list(self.container.children(types=(SNode.LEAF,)))
-        self.assertEqual(len(leafs), 9)
+        leafs = self.container.children(types=(SNode.LEAF,))
+        self.assertEqual(sum(1 for _ in leafs), 9)
         without_choice = [c.name() for c in self.container.children(with_choice=False)]
         with_choice = [c.name() for c in self.container.children(with_choice=True)]
         self.assertTrue("pill" not in without_choice)
@@ -389,16 +392,19 @@ class ListTest(unittest.TestCase):
         "DATA_PATTERN": "/yolo-system:conf/url[proto='%s'][host='%s']",
     }
 
-    def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        self.ctx.load_module("yolo-system")
-        self.ctx.load_module("yolo-nodetypes")
-        self.list = next(self.ctx.find_path(self.PATH["LOG"]))
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR, explicit_compile=True)
+        cls.ctx.load_module("yolo-system")
+        cls.ctx.load_module("yolo-nodetypes")
+        cls.ctx.compile_schema()
+        cls.list = next(cls.ctx.find_path(cls.PATH["LOG"]))
 
-    def tearDown(self):
-        self.list = None
-        self.ctx.destroy()
-        self.ctx = None
+    @classmethod
+    def tearDownClass(cls):
+        cls.list = None
+        cls.ctx.destroy()
+        cls.ctx = None
 
     def test_list_attrs(self):
         self.assertIsInstance(self.list, SList)
@@ -413,16 +419,14 @@ class ListTest(unittest.TestCase):
         self.assertFalse(self.list.ordered())
 
     def test_list_keys(self):
-        keys = list(self.list.keys())
-        self.assertEqual(len(keys), 2)
+        self.assertEqual(sum(1 for _ in self.list.keys()), 2)
 
     def test_list_iter(self):
-        children = list(iter(self.list))
-        self.assertEqual(len(children), 6)
+        self.assertEqual(sum(1 for _ in self.list), 6)
 
     def test_list_children_skip_keys(self):
-        children = list(self.list.children(skip_keys=True))
-        self.assertEqual(len(children), 4)
+        children = self.list.children(skip_keys=True)
+        self.assertEqual(sum(1 for _ in children), 4)
 
     def test_list_parent(self):
         parent = self.list.parent()
@@ -478,15 +482,17 @@ class ListTest(unittest.TestCase):
 
 # -------------------------------------------------------------------------------------
 class RpcTest(unittest.TestCase):
-    def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        self.ctx.load_module("yolo-system")
-        self.rpc = next(self.ctx.find_path("/yolo-system:format-disk"))
-
-    def tearDown(self):
-        self.rpc = None
-        self.ctx.destroy()
-        self.ctx = None
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR)
+        cls.ctx.load_module("yolo-system")
+        cls.rpc = next(cls.ctx.find_path("/yolo-system:format-disk"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.rpc = None
+        cls.ctx.destroy()
+        cls.ctx = None
 
     def test_rpc_attrs(self):
         self.assertIsInstance(self.rpc, SRpc)
@@ -533,13 +539,17 @@ class RpcTest(unittest.TestCase):
 
 # -------------------------------------------------------------------------------------
 class LeafTypeTest(unittest.TestCase):
-    def setUp(self):
-        self.ctx = Context(YANG_DIR)
-        self.ctx.load_module("yolo-system")
-
-    def tearDown(self):
-        self.ctx.destroy()
-        self.ctx = None
+    @classmethod
+    def setUpClass(cls):
+        cls.ctx = Context(YANG_DIR, explicit_compile=True)
+        cls.ctx.load_module("yolo-system")
+        cls.ctx.load_module("yolo-nodetypes")
+        cls.ctx.compile_schema()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ctx.destroy()
+        cls.ctx = None
 
     def test_leaf_type_derived(self):
         leaf = next(self.ctx.find_path("/yolo-system:conf/yolo-system:hostname"))
@@ -595,10 +605,10 @@ class LeafTypeTest(unittest.TestCase):
         self.assertIsInstance(t, Type)
         self.assertEqual(t.name(), "types:number")
         self.assertEqual(t.base(), Type.UNION)
-        types = set(u.name() for u in t.union_types())
-        types2 = set(u.name() for u in t.union_types(with_typedefs=True))
-        self.assertEqual(types, set(["int16", "int32", "uint16", "uint32"]))
-        self.assertEqual(types2, set(["signed", "unsigned"]))
+        types = {u.name() for u in t.union_types()}
+        types2 = {u.name() for u in t.union_types(with_typedefs=True)}
+        self.assertEqual(types, {"int16", "int32", "uint16", "uint32"})
+        self.assertEqual(types2, {"signed", "unsigned"})
         for u in t.union_types():
             ext = u.get_extension(
                 "type-desc", prefix="omg-extensions", arg_value=f"<{u.name()}>"
@@ -606,7 +616,7 @@ class LeafTypeTest(unittest.TestCase):
             self.assertIsInstance(ext, Extension)
             self.assertEqual(len(list(u.extensions())), 2)
         bases = set(t.basenames())
-        self.assertEqual(bases, set(["int16", "int32", "uint16", "uint32"]))
+        self.assertEqual(bases, {"int16", "int32", "uint16", "uint32"})
 
     def test_leaf_type_extensions(self):
         leaf = next(
@@ -655,7 +665,6 @@ class LeafTypeTest(unittest.TestCase):
         self.assertEqual(len(list(leaf.iter_tree(full=True))), 23)
 
     def test_leaf_type_fraction_digits(self):
-        self.ctx.load_module("yolo-nodetypes")
         leaf = next(self.ctx.find_path("/yolo-nodetypes:conf/percentage"))
         self.assertIsInstance(leaf, SLeaf)
         t = leaf.type()